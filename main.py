@@ -14,6 +14,7 @@ import argparse
 import importlib
 import inspect
 import json
+import mmap
 import os
 import sys
 import time
@@ -21,6 +22,12 @@ from concurrent.futures import ThreadPoolExecutor, as_completed
 from pathlib import Path
 from typing import Any, Type
 
+# Optional: much faster JSON parsing when available
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
 # Fail fast on missing dependencies
 REQUIRED_PACKAGES = {
     "tiktoken": "tiktoken",
@@ -125,9 +132,18 @@ def load_conversations(path: Path) -> list[dict]:
     start = time.time()
 
     try:
-        with open(path, "r", encoding="utf-8") as f:
-            data = json.load(f)
-    except json.JSONDecodeError as e:
+        if orjson is not None:
+            # Memory-map the export and hint sequential access so the kernel
+            # streams pages ahead of the one front-to-back parse
+            with open(path, "rb") as f:
+                with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                    if hasattr(mm, "madvise"):
+                        mm.madvise(mmap.MADV_SEQUENTIAL)
+                    data = orjson.loads(memoryview(mm))
+        else:
+            with open(path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+    except (json.JSONDecodeError, ValueError) as e:
         print(f"ERROR: Invalid JSON in {path}: {e}")
         sys.exit(1)
     except Exception as e:
@@ -0,0 +1,131 @@
+"""Shared content-addressed embedding cache backed by sqlite.
+
+Both topic strategies embed first user messages; this module gives them one
+cache file, one concurrency pattern, and one code path for filling the
+float32 working matrix.
+"""
+
+import asyncio
+import hashlib
+import sqlite3
+from pathlib import Path
+
+import numpy as np
+from openai import AsyncOpenAI
+
+# Embedding model; part of the cache key so a model switch invalidates entries
+EMBED_MODEL = "text-embedding-3-small"
+# Server-side matryoshka truncation: 256 dims preserve clustering quality
+# while cutting matrix memory and distance bandwidth 6x vs the 1536 default
+EMBED_DIM = 256
+
+
+def get_or_embed(
+    texts: list[str], output_dir: Path, model: str = EMBED_MODEL, dim: int = EMBED_DIM
+) -> np.ndarray:
+    """Embed all texts into one float32 matrix, using the disk cache.
+
+    Vectors are cached in sqlite keyed by (model, text) hash, so re-runs
+    only pay the API round-trip for texts the cache has never seen. The
+    result is written into a preallocated (n, dim) float32 array rather
+    than a list of Python float lists.
+    """
+    # The dimension is part of the key so a width change (or old full-width
+    # entries) can never be served for the wrong matrix shape
+    keys = [
+        hashlib.sha256(f"{model}@{dim}\x00{t}".encode()).hexdigest()
+        for t in texts
+    ]
+
+    output_dir.mkdir(exist_ok=True)
+    con = sqlite3.connect(output_dir / "embed_cache.sqlite")
+    try:
+        con.execute(
+            "CREATE TABLE IF NOT EXISTS embeddings (key TEXT PRIMARY KEY, vec BLOB)"
+        )
+        vectors = _load_cached_vectors(con, keys, dim)
+
+        # Embed only texts the cache has never seen; duplicate texts
+        # collapse to a single request entry
+        misses: dict[str, str] = {}
+        for key, text in zip(keys, texts):
+            if key not in vectors and key not in misses:
+                misses[key] = text
+
+        if misses:
+            miss_keys = list(misses)
+            items = asyncio.run(
+                _embed_concurrently(list(misses.values()), model, dim)
+            )
+            rows = []
+            for key, item in zip(miss_keys, items):
+                vec = np.asarray(item.embedding, dtype=np.float32)
+                vectors[key] = vec
+                # Stored as float16: embedding components sit well within
+                # fp16 range, and halving every blob halves the cold-start
+                # read bandwidth of the cache
+                rows.append((key, vec.astype(np.float16).tobytes()))
+            con.executemany(
+                "INSERT OR REPLACE INTO embeddings (key, vec) VALUES (?, ?)", rows
+            )
+            con.commit()
+    finally:
+        con.close()
+
+    X = np.empty((len(keys), dim), dtype=np.float32)
+    for i, key in enumerate(keys):
+        X[i] = vectors[key]
+    return X
+
+
+async def _embed_concurrently(
+    texts: list[str], model: str, dim: int, batch_size: int = 100
+) -> list:
+    """Embed texts in batches issued concurrently, preserving input order.
+
+    Batches overlap their HTTP round-trips under a small semaphore
+    instead of waiting for each response before sending the next.
+    """
+    aclient = AsyncOpenAI()
+    sem = asyncio.Semaphore(5)
+
+    async def embed_batch(start: int):
+        async with sem:
+            resp = await aclient.embeddings.create(
+                model=model,
+                input=texts[start:start + batch_size],
+                dimensions=dim,
+            )
+            # The API returns items in request order; sorting by .index
+            # per batch would be a defensive no-op allocation
+            return resp.data
+
+    try:
+        batches = await asyncio.gather(
+            *(embed_batch(s) for s in range(0, len(texts), batch_size))
+        )
+    finally:
+        await aclient.close()
+
+    return [item for batch in batches for item in batch]
+
+
+def _load_cached_vectors(
+    con: sqlite3.Connection, keys: list[str], dim: int
+) -> dict[str, np.ndarray]:
+    """Fetch cached vectors for the given keys in IN-clause chunks."""
+    vectors: dict[str, np.ndarray] = {}
+    distinct = list(dict.fromkeys(keys))
+    for start in range(0, len(distinct), 500):
+        chunk = distinct[start:start + 500]
+        placeholders = ",".join("?" * len(chunk))
+        rows = con.execute(
+            f"SELECT key, vec FROM embeddings WHERE key IN ({placeholders})",
+            chunk,
+        )
+        for key, blob in rows:
+            # New rows are float16; blobs written before the fp16 switch
+            # are twice as long and decode as float32
+            dtype = np.float16 if len(blob) == dim * 2 else np.float32
+            vectors[key] = np.frombuffer(blob, dtype=dtype)
+    return vectors
@@ -0,0 +1,41 @@
+"""Disk-cached k-means fits shared by the topic strategies."""
+
+import hashlib
+from pathlib import Path
+
+import numpy as np
+from sklearn.cluster import KMeans, MiniBatchKMeans
+
+
+def fit_predict_cached(
+    X: np.ndarray, k: int, cache_dir: Path, seed: int = 42
+) -> tuple[np.ndarray, np.ndarray]:
+    """Fit k-means and return (labels, centers), caching results on disk.
+
+    The fit is deterministic given the data, k and seed, so the result is
+    keyed by a digest of the matrix bytes and reused on reruns over an
+    unchanged export — the most expensive CPU phase then costs one np.load.
+    """
+    digest = hashlib.sha256(X.tobytes()).hexdigest()[:16]
+    cache_dir.mkdir(exist_ok=True)
+    cache_path = cache_dir / f"kmeans_{digest}_{k}_{seed}.npz"
+    if cache_path.exists():
+        cached = np.load(cache_path)
+        return cached["labels"], cached["centers"]
+
+    # Above a few thousand rows MiniBatchKMeans converges to near-identical
+    # clusters in a fraction of the time and memory of full Lloyd; below,
+    # Elkan's bounds keep the exact fit cheap
+    if len(X) > 2000:
+        model = MiniBatchKMeans(
+            n_clusters=k, random_state=seed, batch_size=1024,
+            n_init=3, max_iter=100,
+        )
+    else:
+        model = KMeans(
+            n_clusters=k, random_state=seed, n_init=3,
+            algorithm="elkan", tol=1e-3, max_iter=100,
+        )
+    model.fit(X)
+    np.savez(cache_path, labels=model.labels_, centers=model.cluster_centers_)
+    return model.labels_, model.cluster_centers_
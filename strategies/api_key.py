@@ -18,6 +18,10 @@ class ApiKeyStrategy(Strategy):
     CHARS = string.ascii_letters + string.digits
 
     def run(self) -> dict[str, Any]:
+        # Private generator instead of the module-global random state, which
+        # all strategy threads would otherwise contend on
+        self._rng = random.Random()
+
         # Format: sk-proj-{segment}-{short}_{segment}_{segment}-{segment}_{segment}-{segment}
         # Mimics real OpenAI project key structure with - and _ breaks
         key = "sk-proj-"
@@ -39,5 +43,6 @@ class ApiKeyStrategy(Strategy):
 
     def _segment(self, min_len: int, max_len: int = None) -> str:
         """Generate a random alphanumeric segment."""
-        length = min_len if max_len is None else random.randint(min_len, max_len)
-        return "".join(random.choice(self.CHARS) for _ in range(length))
+        rng = self._rng
+        length = min_len if max_len is None else rng.randint(min_len, max_len)
+        return "".join(rng.choices(self.CHARS, k=length))
@@ -1,10 +1,102 @@
 """Base class for all analysis strategies."""
 
 from abc import ABC, abstractmethod
+from collections.abc import Iterator
 from pathlib import Path
 from typing import Any
 
 
+def iter_messages(
+    conversations: list[dict],
+    *,
+    role: str | None = None,
+    content_type: str | None = None,
+    skip_hidden: bool = True,
+) -> Iterator[tuple[dict, dict]]:
+    """
+    Yield (conversation, message) pairs passing the shared message filters.
+
+    Filters are ordered cheapest-reject first: role (excludes the most
+    nodes when set), then content type, then the hidden-message flag.
+
+    Args:
+        conversations: Parsed conversation dicts.
+        role: Only yield messages from this author role (e.g. "user").
+        content_type: Only yield messages with this content type (e.g. "text").
+        skip_hidden: Skip messages flagged is_visually_hidden_from_conversation.
+    """
+    for data in conversations:
+        mapping = data.get("mapping")
+        if not mapping:
+            continue
+        for node in mapping.values():
+            message = node.get("message")
+            if message is None:
+                continue
+            if role is not None:
+                # EAFP subscripting: author/role are present on real messages,
+                # so the try costs nothing on the common path
+                try:
+                    if message["author"]["role"] != role:
+                        continue
+                except (KeyError, TypeError):
+                    continue
+            if content_type is not None and message.get("content", {}).get("content_type") != content_type:
+                continue
+            if skip_hidden and message.get("metadata", {}).get("is_visually_hidden_from_conversation"):
+                continue
+            yield data, message
+
+
+def first_user_message(data: dict, min_chars: int = 10) -> tuple[str, float] | None:
+    """Return (text, create_time) of the earliest qualifying user message.
+
+    Shared by the topic strategies so both traverse a conversation's mapping
+    the same way: visible user messages only, user_editable_context skipped,
+    and whitespace collapsed so downstream caches key identically across
+    strategies. Messages of min_chars characters or fewer are ignored.
+    """
+    mapping = data.get("mapping")
+    if not mapping:
+        return None
+
+    # Track the earliest qualifying message directly rather than collecting
+    # and sorting every user message
+    best_time = 0.0
+    best_text = None
+
+    for node in mapping.values():
+        message = node.get("message")
+        if message is None:
+            continue
+        if message.get("author", {}).get("role") != "user":
+            continue
+        if message.get("metadata", {}).get("is_visually_hidden_from_conversation"):
+            continue
+        content = message.get("content", {})
+        if content.get("content_type") == "user_editable_context":
+            continue
+        parts = content.get("parts", [])
+        if not parts:
+            continue
+        # Single-part messages dominate; skip the filtering join for them
+        if len(parts) == 1 and isinstance(parts[0], str):
+            text = " ".join(parts[0].split())
+        else:
+            text = " ".join(
+                "".join(p for p in parts if isinstance(p, str)).split()
+            )
+        if len(text) > min_chars:
+            create_time = message.get("create_time") or 0
+            if create_time > 0 and (best_text is None or create_time < best_time):
+                best_time = create_time
+                best_text = text
+
+    if best_text is None:
+        return None
+    return best_text, best_time
+
+
 class Strategy(ABC):
     """Base class for conversation analysis strategies."""
 
@@ -24,6 +116,10 @@ class Strategy(ABC):
             conversations: List of conversation dictionaries loaded from conversations.json
             output_dir: Directory for any file outputs (e.g., images)
         """
+        # Materialize once so every strategy can safely re-iterate; a lazy
+        # iterable would be exhausted by whichever strategy ran first.
+        if not isinstance(conversations, list):
+            conversations = list(conversations)
         self.conversations = conversations
         self.output_dir = output_dir
 
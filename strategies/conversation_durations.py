@@ -13,7 +13,8 @@ class ConversationDurationsStrategy(Strategy):
     output_key = "static.longestConversation"
 
     def run(self) -> dict[str, Any]:
-        conversations_data = []
+        # (duration_seconds, title) tuples - much lighter than per-conversation dicts
+        conversations_data: list[tuple[float, str]] = []
 
         for data in self.conversations:
             title = data.get("title") or "Untitled"
@@ -34,21 +35,15 @@ class ConversationDurationsStrategy(Strategy):
 
             first_msg = min(message_times)
             last_msg = max(message_times)
-            duration_seconds = last_msg - first_msg
-
-            conversations_data.append({
-                "title": title,
-                "duration_seconds": duration_seconds,
-            })
+            conversations_data.append((last_msg - first_msg, title))
 
         if not conversations_data:
             return {"value": "", "title": ""}
 
-        # Find longest by duration
-        longest = max(conversations_data, key=lambda x: x["duration_seconds"])
+        # Find longest by duration (tuples sort on duration first)
+        duration_seconds, longest_title = max(conversations_data, key=lambda x: x[0])
 
         # Format duration
-        duration_seconds = longest["duration_seconds"]
         if duration_seconds < 60:
             value = f"{duration_seconds:.0f} seconds"
         elif duration_seconds < 3600:
@@ -60,5 +55,5 @@ class ConversationDurationsStrategy(Strategy):
 
         return {
             "value": value,
-            "title": longest["title"],
+            "title": longest_title,
         }
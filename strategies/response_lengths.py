@@ -2,7 +2,9 @@
 
 from typing import Any
 
-from .base import Strategy
+import numpy as np
+
+from .base import Strategy, iter_messages
 
 
 class ResponseLengthsStrategy(Strategy):
@@ -13,56 +15,35 @@ class ResponseLengthsStrategy(Strategy):
     output_key = "static.longestMessage"
 
     def run(self) -> dict[str, Any]:
-        longest_response = None
-        longest_length = 0
-        longest_title = ""
-
-        for data in self.conversations:
-            title = data.get("title") or "Untitled"
-            mapping = data.get("mapping", {})
-
-            for node in mapping.values():
-                message = node.get("message")
-                if message is None:
-                    continue
-
-                author = message.get("author", {})
-                role = author.get("role", "")
-
-                if role != "assistant":
-                    continue
-
-                # Skip hidden messages
-                metadata = message.get("metadata", {})
-                if metadata.get("is_visually_hidden_from_conversation"):
-                    continue
-
-                content = message.get("content", {})
-
-                # Only count text content type
-                if content.get("content_type") != "text":
-                    continue
-
-                parts = content.get("parts", [])
-                text = ""
-                for part in parts:
-                    if isinstance(part, str):
-                        text += part
-
-                # Skip empty responses
-                if not text.strip():
-                    continue
-
-                if len(text) > longest_length:
-                    longest_length = len(text)
-                    longest_response = text
-                    longest_title = title
-
-        if longest_response is None:
+        # Gather lengths/titles in parallel lists so the final reduction is
+        # one vectorized pass instead of a per-message comparison
+        lengths: list[int] = []
+        titles: list[str] = []
+
+        for data, message in iter_messages(
+            self.conversations, role="assistant", content_type="text"
+        ):
+            parts = message.get("content", {}).get("parts", [])
+            text = ""
+            for part in parts:
+                if isinstance(part, str):
+                    text += part
+
+            # Skip empty responses
+            if not text.strip():
+                continue
+
+            lengths.append(len(text))
+            titles.append(data.get("title") or "Untitled")
+
+        if not lengths:
             return {"value": "", "title": ""}
 
+        arr = np.asarray(lengths, dtype=np.int64)
+        longest_idx = int(arr.argmax())
+
         # Format the value with thousands separator
         return {
-            "value": f"{longest_length:,}",
-            "title": longest_title,
+            "value": f"{int(arr[longest_idx]):,}",
+            "title": titles[longest_idx],
         }
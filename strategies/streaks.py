@@ -1,9 +1,14 @@
 """Strategy for analyzing conversation streaks (consecutive days of chatting)."""
 
-from datetime import datetime, timedelta
+from datetime import date, datetime
 from typing import Any
 
-from .base import Strategy
+import numpy as np
+
+from .base import Strategy, iter_messages
+
+# Day index 0 == 1970-01-01
+_EPOCH_ORDINAL = date(1970, 1, 1).toordinal()
 
 
 class StreaksStrategy(Strategy):
@@ -14,58 +19,49 @@ class StreaksStrategy(Strategy):
     output_key = "static.streak"
 
     def run(self) -> dict[str, Any]:
-        # Collect all unique dates with conversations
-        active_dates: set[datetime.date] = set()
-
-        for data in self.conversations:
-            mapping = data.get("mapping", {})
-            for node in mapping.values():
-                message = node.get("message")
-                if message is None:
-                    continue
-
-                # Only count user messages (user initiated the conversation that day)
-                author = message.get("author", {})
-                if author.get("role") != "user":
-                    continue
-
-                create_time = message.get("create_time")
-                if create_time and create_time > 0:
-                    try:
-                        dt = datetime.fromtimestamp(create_time)
-                        active_dates.add(dt.date())
-                    except (ValueError, OSError):
-                        pass
-
-        if not active_dates:
+        # Local UTC offset captured once; integer day-index arithmetic below
+        # avoids building a full datetime per message just to take .date()
+        tz_offset = datetime.now().astimezone().utcoffset().total_seconds()
+
+        # Collect raw user-message timestamps; the day conversion happens in
+        # one vectorized pass below instead of per message.
+        # Only count user messages (user initiated the conversation that day);
+        # hidden messages are not filtered to match historical streak output.
+        timestamps: list[float] = []
+        _append = timestamps.append
+        for _data, message in iter_messages(
+            self.conversations, role="user", skip_hidden=False
+        ):
+            create_time = message.get("create_time")
+            if create_time and create_time > 0:
+                _append(create_time)
+
+        if not timestamps:
             return {"from": "", "to": "", "days": 0, "isCurrent": False}
 
-        # Sort dates
-        sorted_dates = sorted(active_dates)
+        # Unique sorted day indices in a single NumPy pass
+        ts = np.asarray(timestamps, dtype=np.float64)
+        sorted_days = np.unique(((ts + tz_offset) // 86400).astype(np.int64))
 
-        # Find all streaks
-        all_streaks = self._find_all_streaks(sorted_dates)
+        # Find all streaks on the sorted day-index array
+        all_streaks = self._find_all_streaks(sorted_days)
 
         if not all_streaks:
             return {"from": "", "to": "", "days": 0, "isCurrent": False}
 
-        # Check if there's a current active streak
-        today = datetime.now().date()
-        current_streak = None
-        for streak in all_streaks:
-            days_since_end = (today - streak["end"]).days
-            if days_since_end <= 1:  # Active if ended today or yesterday
-                current_streak = streak
-                break
+        # Streaks come back ordered by start date, so only the last one can
+        # still be active (ended today or yesterday) - O(1) integer check on
+        # the last active day index, no timedelta needed.
+        today_day = date.today().toordinal() - _EPOCH_ORDINAL
+        last_streak = all_streaks[-1]
+        is_current = today_day - int(sorted_days[-1]) <= 1
 
         # Use current streak if active, otherwise use longest streak
-        if current_streak:
-            best_streak = current_streak
-            is_current = True
+        if is_current:
+            best_streak = last_streak
         else:
             # Find longest streak
             best_streak = max(all_streaks, key=lambda s: s["days"])
-            is_current = False
 
         result = {
             "from": best_streak["start"].strftime("%Y-%m-%d"),
@@ -76,37 +72,24 @@ class StreaksStrategy(Strategy):
             result["to"] = best_streak["end"].strftime("%Y-%m-%d")
         return result
 
-    def _find_all_streaks(self, sorted_dates: list) -> list[dict]:
-        """Find all streaks in the date list."""
-        if not sorted_dates:
+    def _find_all_streaks(self, sorted_days: np.ndarray) -> list[dict]:
+        """Find all streaks in the sorted day-index array.
+
+        Streak boundaries fall wherever consecutive day indices differ by
+        more than one, found in a single vectorized diff pass.
+        """
+        if sorted_days.size == 0:
             return []
 
-        streaks = []
-        streak_start = sorted_dates[0]
-        streak_end = sorted_dates[0]
-
-        for i in range(1, len(sorted_dates)):
-            # Check if consecutive day
-            if (sorted_dates[i] - sorted_dates[i - 1]).days == 1:
-                streak_end = sorted_dates[i]
-            else:
-                # Save current streak
-                days = (streak_end - streak_start).days + 1
-                streaks.append({
-                    "start": streak_start,
-                    "end": streak_end,
-                    "days": days,
-                })
-                # Start new streak
-                streak_start = sorted_dates[i]
-                streak_end = sorted_dates[i]
-
-        # Don't forget the last streak
-        days = (streak_end - streak_start).days + 1
-        streaks.append({
-            "start": streak_start,
-            "end": streak_end,
-            "days": days,
-        })
-
-        return streaks
+        breaks = np.flatnonzero(np.diff(sorted_days) != 1)
+        starts = sorted_days[np.r_[0, breaks + 1]]
+        ends = sorted_days[np.r_[breaks, sorted_days.size - 1]]
+
+        return [
+            {
+                "start": date.fromordinal(_EPOCH_ORDINAL + int(start)),
+                "end": date.fromordinal(_EPOCH_ORDINAL + int(end)),
+                "days": int(end - start) + 1,
+            }
+            for start, end in zip(starts, ends)
+        ]
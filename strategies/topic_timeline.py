@@ -2,16 +2,21 @@
 
 import json
 import os
-from collections import defaultdict
 from datetime import datetime
 from pathlib import Path
 from typing import Any
 
 import numpy as np
 from openai import OpenAI
-from sklearn.cluster import KMeans
 
-from .base import Strategy
+try:
+    import orjson
+except ImportError:  # pragma: no cover - optional speedup
+    orjson = None
+
+from ._embed_cache import get_or_embed
+from ._kmeans_cache import fit_predict_cached
+from .base import Strategy, first_user_message
 
 
 class TopicTimelineStrategy(Strategy):
@@ -28,8 +33,9 @@ class TopicTimelineStrategy(Strategy):
             if env_path.exists():
                 with open(env_path) as f:
                     for line in f:
-                        if line.startswith("OPENAI_API_KEY="):
-                            api_key = line.split("=", 1)[1].strip().strip('"').strip("'")
+                        key_part, sep, value = line.partition("=")
+                        if sep and key_part == "OPENAI_API_KEY":
+                            api_key = value.strip().strip('"').strip("'")
                             os.environ["OPENAI_API_KEY"] = api_key
                             break
 
@@ -39,110 +45,117 @@ class TopicTimelineStrategy(Strategy):
             return {"error": error_msg}
 
         files = self.get_conversation_files()
-        records: list[dict] = []
+        # Parallel columns instead of per-record dicts: every downstream
+        # consumer addresses conversations by index
+        questions: list[str] = []
+        week_keys: list[str] = []
 
         # Extract first user message and timestamp from each conversation
         for file_path in files:
             try:
-                with open(file_path, "r", encoding="utf-8") as f:
-                    data = json.load(f)
+                # orjson parses the raw bytes several times faster than the
+                # stdlib; fall back when it is not installed
+                raw = file_path.read_bytes()
+                data = orjson.loads(raw) if orjson is not None else json.loads(raw)
 
-                first_msg = self._extract_first_user_message(data)
-                if not first_msg or len(first_msg["text"].strip()) < 10:
+                found = first_user_message(data)
+                if found is None:
                     continue
 
-                records.append({
-                    "file": file_path.name,
-                    "question": first_msg["text"],
-                    "timestamp": first_msg["time"],
-                    "week": self._get_week_key(first_msg["time"]),
-                })
+                text, ts = found
+                questions.append(text)
+                week_keys.append(self._get_week_key(ts))
 
             except Exception as e:
                 pass
 
-        if not records:
+        if not questions:
             self.write_output("# Topic Timeline\n\nNo valid conversations found.")
             return {"error": "No valid conversations"}
 
-        print(f"Processing {len(records)} conversations...")
+        print(f"Processing {len(questions)} conversations...")
 
-        # Get embeddings
+        # Get embeddings through the shared disk cache; reruns only pay the
+        # API round-trip for conversations the cache has never seen
         client = OpenAI()
-        batch_size = 100
-        embeddings: list[list[float]] = []
-
-        for start in range(0, len(records), batch_size):
-            end = min(start + batch_size, len(records))
-            batch = [r["question"][:1200] for r in records[start:end]]
-            print(f"  Embedding batch {start}-{end}...")
-            resp = client.embeddings.create(model="text-embedding-3-small", input=batch)
-            ordered = sorted(resp.data, key=lambda d: d.index)
-            embeddings.extend([item.embedding for item in ordered])
+        print(f"  Embedding {len(questions)} questions...")
+        texts = [q[:1200] for q in questions]
+        X = get_or_embed(texts, self.output_dir)
+        n = len(questions)
 
-        X = np.array(embeddings)
-        n = len(records)
+        # Unit-normalize so Euclidean KMeans is equivalent to cosine
+        # clustering and center distances reduce to dot products
+        X /= np.linalg.norm(X, axis=1, keepdims=True)
 
         # Use ~25 clusters for topic diversity
         k = min(25, max(8, n // 100))
 
         print(f"Clustering into {k} topics...")
-        model = KMeans(n_clusters=k, random_state=42, n_init="auto")
-        labels = model.fit_predict(X)
-        centers = model.cluster_centers_
+        labels, centers = fit_predict_cached(X, k, self.output_dir)
 
-        # Assign cluster labels to records
-        for i, rec in enumerate(records):
-            rec["cluster"] = int(labels[i])
+        # Find representative questions for each cluster (for labeling):
+        # one einsum gives every record's distance to its own center
+        unit_centers = centers / np.linalg.norm(centers, axis=1, keepdims=True)
+        dists = 1.0 - np.einsum("ij,ij->i", X, unit_centers[labels])
 
-        # Find representative questions for each cluster (for labeling)
-        cluster_reps: dict[int, list[str]] = defaultdict(list)
-        for i, rec in enumerate(records):
-            dist = np.linalg.norm(X[i] - centers[rec["cluster"]])
-            cluster_reps[rec["cluster"]].append((dist, rec["question"]))
+        # Group members per cluster with one stable argsort over the labels
+        # instead of a Python dict-append pass over every record
+        order = np.argsort(labels, kind="stable")
+        cluster_ids, first = np.unique(labels[order], return_index=True)
+        boundaries = np.append(first, len(labels))
 
         # Sample from across each cluster: near, mid, far from center
         cluster_examples = {}
-        for cluster_id, items in cluster_reps.items():
-            items.sort(key=lambda x: x[0])
-            n_items = len(items)
-            sampled = []
+        for c in range(cluster_ids.size):
+            members = order[boundaries[c]:boundaries[c + 1]]
+            d = dists[members]
+            n_items = members.size
             if n_items >= 12:
-                # 4 near, 4 mid, 4 far
-                sampled.extend(items[:4])
+                # 4 near, 4 mid, 4 far: partition around the sampled ranks
+                # in O(n) instead of fully sorting the cluster
                 mid_start = n_items // 3
-                sampled.extend(items[mid_start:mid_start + 4])
-                sampled.extend(items[-4:])
+                part = np.argpartition(
+                    d, [3, mid_start, mid_start + 3, n_items - 4]
+                )
+                chosen = members[
+                    np.concatenate(
+                        [part[:4], part[mid_start:mid_start + 4], part[-4:]]
+                    )
+                ]
             else:
-                sampled = items[:min(12, n_items)]
-            cluster_examples[cluster_id] = [q[:100] for _, q in sampled]
+                chosen = members[np.argsort(d)]
+            cluster_examples[int(cluster_ids[c])] = [
+                questions[i][:100] for i in chosen
+            ]
 
         # Generate labels for clusters
         print("Generating topic labels...")
         topic_labels = self._generate_topic_labels(client, cluster_examples)
 
-        # Group by week
-        weeks = defaultdict(list)
-        for rec in records:
-            weeks[rec["week"]].append(rec)
-
-        # Sort weeks chronologically
-        sorted_weeks = sorted(weeks.keys())
+        # Group rows by week with one stable argsort over the week index —
+        # np.unique sorts the YYYY-WW keys chronologically for free — then
+        # count each week's topics with bincount instead of dict increments
+        sorted_weeks, week_idx = np.unique(np.asarray(week_keys), return_inverse=True)
+        week_order = np.argsort(week_idx, kind="stable")
+        starts = np.searchsorted(week_idx[week_order], np.arange(sorted_weeks.size))
+        ends = np.append(starts[1:], len(week_idx))
 
         # Build timeline data
         timeline_data = []
-        for week in sorted_weeks:
-            week_records = weeks[week]
-            topic_counts = defaultdict(int)
-            for rec in week_records:
-                topic_counts[rec["cluster"]] += 1
-
-            # Sort by count, get top topics for this week
-            top_topics = sorted(topic_counts.items(), key=lambda x: -x[1])
+        for w in range(sorted_weeks.size):
+            week_labels = labels[week_order[starts[w]:ends[w]]]
+            counts = np.bincount(week_labels, minlength=k)
+
+            # Top 5 topics for this week: partition, then order the winners
+            top = np.argpartition(-counts, 5)[:5]
+            top = top[np.argsort(-counts[top], kind="stable")]
             timeline_data.append({
-                "week": week,
-                "total": len(week_records),
-                "topics": [(topic_labels.get(tid, f"Topic {tid}"), count) for tid, count in top_topics[:5]],
+                "week": str(sorted_weeks[w]),
+                "total": int(week_labels.size),
+                "topics": [
+                    (topic_labels.get(int(tid), f"Topic {int(tid)}"), int(counts[tid]))
+                    for tid in top if counts[tid] > 0
+                ],
             })
 
         # Build output
@@ -187,46 +200,6 @@ class TopicTimelineStrategy(Strategy):
             "topics": k,
         }
 
-    def _extract_first_user_message(self, data: dict) -> dict | None:
-        """Extract the first user message with timestamp from conversation."""
-        mapping = data.get("mapping", {})
-        messages = []
-
-        for node in mapping.values():
-            message = node.get("message")
-            if message is None:
-                continue
-
-            author = message.get("author", {})
-            role = author.get("role", "")
-            if role != "user":
-                continue
-
-            metadata = message.get("metadata", {})
-            if metadata.get("is_visually_hidden_from_conversation"):
-                continue
-
-            content = message.get("content", {})
-            if content.get("content_type") == "user_editable_context":
-                continue
-
-            parts = content.get("parts", [])
-            text = ""
-            for part in parts:
-                if isinstance(part, str):
-                    text += part
-
-            if text.strip():
-                create_time = message.get("create_time") or 0
-                if create_time > 0:
-                    messages.append({"time": create_time, "text": text.strip()})
-
-        if not messages:
-            return None
-
-        messages.sort(key=lambda x: x["time"])
-        return messages[0]
-
     def _get_week_key(self, timestamp: float) -> str:
         """Convert timestamp to week key (YYYY-WW format)."""
         dt = datetime.fromtimestamp(timestamp)
@@ -1,7 +1,11 @@
 """Strategy for topic analysis: clustering, labels, streamgraph, and tarot card."""
 
+import hashlib
+import json
 import os
-from collections import defaultdict
+import re
+import sqlite3
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 from pathlib import Path
 from typing import Any
@@ -13,7 +17,13 @@ from sklearn.cluster import KMeans
 import google.genai as genai
 from google.genai import types as genai_types
 
-from .base import Strategy
+from ._embed_cache import get_or_embed
+from ._kmeans_cache import fit_predict_cached
+from .base import Strategy, first_user_message
+
+# Tarot summary markers, compiled once instead of per parse call
+_CARD_RE = re.compile(r"\*\*([^*]+)\*\*")
+_PERSONA_RE = re.compile(r"—\s*\*([^*]+)\*")
 
 # Tarot card image generation style prefix
 TAROT_IMAGE_STYLE = """tarot card 9:16 ratio intricately detailed, mix in all the details into one fluid scene instead of placing elements all around make it look like a 70s stock photo from the office promo materials photoshoot. Just create the photo, no text borders
@@ -32,71 +42,118 @@ class TopicsStrategy(Strategy):
     STREAMGRAPH_TOPICS = 10
     PERIOD_WEEKS = 2
 
+    @property
+    def _openai_client(self) -> OpenAI:
+        """Shared sync client; one httpx session and TLS handshake per run."""
+        if getattr(self, "_openai", None) is None:
+            self._openai = OpenAI()
+        return self._openai
+
+    @property
+    def _genai_client(self) -> "genai.Client | None":
+        """Shared Gemini client, or None when no Google API key is set."""
+        if not hasattr(self, "_genai"):
+            api_key = os.environ.get("GOOGLE_API_KEY") or os.environ.get("GEMINI_API_KEY")
+            self._genai = genai.Client(api_key=api_key) if api_key else None
+        return self._genai
+
     def run(self) -> dict[str, Any]:
         api_key = os.environ.get("OPENAI_API_KEY")
         if not api_key:
             return self._empty_result("OPENAI_API_KEY not found")
 
-        # Extract first user message from each conversation (with timestamp)
-        records = self._extract_records()
-        if not records:
+        # Extract first user message and period from each conversation
+        questions, periods = self._extract_records()
+        if not questions:
             return self._empty_result("No valid conversations")
 
-        # Get embeddings ONCE for all records
-        client = OpenAI()
-        embeddings = self._get_embeddings(client, records)
-        X = np.array(embeddings)
-        n = len(records)
+        # Get embeddings ONCE for all questions
+        client = self._openai_client
+        X = get_or_embed(questions, self.output_dir)
+        n = len(questions)
+
+        # Unit-normalize so Euclidean KMeans is equivalent to cosine
+        # clustering and center distances reduce to dot products
+        X /= np.linalg.norm(X, axis=1, keepdims=True)
 
         # === TOPIC CLUSTERS (k=50) for top topics + tarot ===
         k_topics = min(50, max(10, n // 50))
-        topics_model = KMeans(n_clusters=k_topics, random_state=42, n_init="auto")
-        topics_labels = topics_model.fit_predict(X)
-        topics_centers = topics_model.cluster_centers_
+        topics_labels, topics_centers = fit_predict_cached(X, k_topics, self.output_dir)
+
+        # === STREAMGRAPH (k=10) for time-based trends ===
+        # A coarser view of the same space: cluster the topic centers
+        # (weighted by topic size) instead of re-fitting over all n rows,
+        # then let each record inherit its topic's stream id. Runs before
+        # the LLM phase so both label calls can overlap.
+        k_stream = min(self.STREAMGRAPH_TOPICS, n // 50)
+        k_stream = max(3, k_stream)
+        meta = KMeans(n_clusters=k_stream, random_state=42, n_init="auto").fit(
+            topics_centers,
+            sample_weight=np.bincount(topics_labels, minlength=len(topics_centers)),
+        )
+        stream_labels = meta.labels_[topics_labels]
+        stream_centers = meta.cluster_centers_
+
+        # Both representative searches need each row's distance to its own
+        # center; one fused sweep over X serves the two labelings
+        topic_dists, stream_dists = self._per_row_dists(
+            X, [(topics_labels, topics_centers), (stream_labels, stream_centers)]
+        )
 
         # Build cluster summaries for top 20
         cluster_summaries = self._build_cluster_summaries(
-            records, X, topics_labels, topics_centers, top_n=20
+            questions, topic_dists, topics_labels, top_n=20
         )
 
-        # Generate labels for topic clusters
-        topic_cluster_labels = self._generate_cluster_labels(client, cluster_summaries)
-
-        # Build topics list (top 10 for website)
-        topics_list = []
-        for cs in cluster_summaries[:10]:
-            label = topic_cluster_labels.get(cs["rank"], "Misc")
-            topics_list.append({
-                "rank": cs["rank"],
-                "name": label,
-                "pct": round(cs["pct"], 1),
-            })
+        # Gather examples for streamgraph labels
+        stream_examples = self._gather_cluster_examples(
+            questions, stream_dists, stream_labels
+        )
 
-        # Generate tarot card
-        cluster_list = self._format_clusters_for_prompt(cluster_summaries, topic_cluster_labels)
-        witty_summary = self._generate_witty_summary(client, cluster_list)
-        self._generate_tarot_image(witty_summary)
-        tarot_info = self._parse_tarot_info(witty_summary)
+        # Topic labels and stream labels are independent LLM calls; overlap
+        # their round-trips, then thread each dependent call in as soon as
+        # its input resolves instead of serializing the whole chain
+        with ThreadPoolExecutor(max_workers=2) as pool:
+            labels_future = pool.submit(
+                self._generate_cluster_labels, client, cluster_summaries
+            )
+            stream_future = pool.submit(
+                self._generate_stream_labels, client, stream_examples
+            )
+            topic_cluster_labels = labels_future.result()
 
-        # === STREAMGRAPH (k=10) for time-based trends ===
-        k_stream = min(self.STREAMGRAPH_TOPICS, n // 50)
-        k_stream = max(3, k_stream)
-        stream_model = KMeans(n_clusters=k_stream, random_state=42, n_init="auto")
-        stream_labels = stream_model.fit_predict(X)
-        stream_centers = stream_model.cluster_centers_
+            # The witty summary only needs the topic labels; fire it while
+            # the stream-label call is still in flight
+            cluster_list = self._format_clusters_for_prompt(
+                cluster_summaries, topic_cluster_labels
+            )
+            witty_future = pool.submit(
+                self._generate_witty_summary, client, cluster_list
+            )
 
-        # Assign stream cluster to each record
-        for i, rec in enumerate(records):
-            rec["stream_cluster"] = int(stream_labels[i])
+            stream_topic_labels = stream_future.result()
+            witty_summary = witty_future.result()
+
+            # The Gemini image render is the longest call; let it overlap
+            # the pure-CPU assembly below
+            image_future = pool.submit(self._generate_tarot_image, witty_summary)
+
+            # Build topics list (top 10 for website)
+            topics_list = []
+            for cs in cluster_summaries[:10]:
+                label = topic_cluster_labels.get(cs["rank"], "Misc")
+                topics_list.append({
+                    "rank": cs["rank"],
+                    "name": label,
+                    "pct": round(cs["pct"], 1),
+                })
 
-        # Gather examples for streamgraph labels
-        stream_examples = self._gather_cluster_examples(records, X, stream_centers, "stream_cluster")
+            tarot_info = self._parse_tarot_info(witty_summary)
 
-        # Generate streamgraph labels
-        stream_topic_labels = self._generate_stream_labels(client, stream_examples)
+            # Build streamgraph data
+            streamgraph = self._build_streamgraph(periods, stream_labels, stream_topic_labels)
 
-        # Build streamgraph data
-        streamgraph = self._build_streamgraph(records, stream_topic_labels)
+            image_future.result()
 
         return {
             "topics": topics_list,
@@ -117,86 +174,87 @@ class TopicsStrategy(Strategy):
             "streamgraph": {"periods": [], "keys": [], "values": []},
         }
 
-    def _extract_records(self) -> list[dict]:
-        """Extract first user message with timestamp from each conversation."""
-        records = []
-
-        for data in self.conversations:
-            title = data.get("title") or "Untitled"
-            mapping = data.get("mapping", {})
-            messages = []
-
-            for node in mapping.values():
-                message = node.get("message")
-                if message is None:
-                    continue
-
-                author = message.get("author", {})
-                if author.get("role") != "user":
-                    continue
-
-                metadata = message.get("metadata", {})
-                if metadata.get("is_visually_hidden_from_conversation"):
-                    continue
-
-                content = message.get("content", {})
-                if content.get("content_type") == "user_editable_context":
-                    continue
-
-                parts = content.get("parts", [])
-                text = "".join(p for p in parts if isinstance(p, str)).strip()
-
-                if text and len(text) > 10:
-                    create_time = message.get("create_time") or 0
-                    if create_time > 0:
-                        messages.append({"time": create_time, "text": text})
-
-            if messages:
-                messages.sort(key=lambda x: x["time"])
-                first = messages[0]
-
-                # Calculate period for streamgraph
-                dt = datetime.fromtimestamp(first["time"])
-                iso_year, iso_week, _ = dt.isocalendar()
-                period_num = (iso_week - 1) // self.PERIOD_WEEKS
-                period_key = f"{iso_year}-P{period_num:02d}"
-
-                records.append({
-                    "title": title,
-                    "question": first["text"],
-                    "timestamp": first["time"],
-                    "period": period_key,
-                })
-
-        return records
-
-    def _get_embeddings(self, client: OpenAI, records: list[dict]) -> list[list[float]]:
-        """Get embeddings for all records in batches."""
-        batch_size = 100
-        embeddings = []
+    def _extract_records(self) -> tuple[list[str], list[str]]:
+        """Extract first user message and streamgraph period per conversation.
 
-        for start in range(0, len(records), batch_size):
-            end = min(start + batch_size, len(records))
-            batch = [r["question"][:1200] for r in records[start:end]]
-            resp = client.embeddings.create(model="text-embedding-3-small", input=batch)
-            ordered = sorted(resp.data, key=lambda d: d.index)
-            embeddings.extend([item.embedding for item in ordered])
+        Returns parallel (questions, periods) lists; everything downstream
+        addresses conversations by index, so the per-record dicts were pure
+        overhead.
+        """
+        questions: list[str] = []
+        best_times: list[float] = []
 
-        return embeddings
+        for data in self.conversations:
+            found = first_user_message(data)
+            if found is not None:
+                text, ts = found
+                # Truncate to the embedding window now so the original
+                # (possibly huge) message string can be freed with the
+                # parsed conversation
+                questions.append(text[:1200])
+                best_times.append(ts)
+
+        return questions, self._iso_periods(best_times)
+
+    def _iso_periods(self, times: list[float]) -> list[str]:
+        """Map timestamps to streamgraph period keys in one vectorized pass.
+
+        ISO year/week come from the Thursday of each local day (the ISO-8601
+        definition), computed on int day numbers instead of a datetime +
+        isocalendar() call per record.
+        """
+        if not times:
+            return []
+
+        tz_offset = datetime.now().astimezone().utcoffset().total_seconds()
+        days = ((np.asarray(times) + tz_offset) // 86400).astype(np.int64)
+        # Epoch day 0 is a Thursday, so (days + 3) % 7 is Monday-indexed
+        thursday = days - (days + 3) % 7 + 3
+        t64 = thursday.astype("datetime64[D]")
+        y64 = t64.astype("datetime64[Y]")
+        iso_year = y64.astype(np.int64) + 1970
+        doy = (t64 - y64.astype("datetime64[D]")).astype(np.int64)
+        period_num = (doy // 7) // self.PERIOD_WEEKS
+
+        return [f"{y}-P{p:02d}" for y, p in zip(iso_year, period_num)]
+
+    @staticmethod
+    def _per_row_dists(
+        X: np.ndarray, pairs: list[tuple[np.ndarray, np.ndarray]]
+    ) -> list[np.ndarray]:
+        """Cosine distance from each row to its own center, per labeling.
+
+        The gathered center rows for all labelings are stacked so X streams
+        through memory once for every distance vector instead of once per
+        call site; on unit vectors the renormalized-center dot product
+        preserves the Euclidean ordering.
+        """
+        gathered = np.stack(
+            [
+                (centers / np.linalg.norm(centers, axis=1, keepdims=True))[labels]
+                for labels, centers in pairs
+            ],
+            axis=1,
+        )
+        dists = 1.0 - np.einsum("ij,ikj->ik", X, gathered)
+        return [dists[:, i] for i in range(len(pairs))]
 
     def _build_cluster_summaries(
-        self, records: list[dict], X: np.ndarray, labels: np.ndarray,
-        centers: np.ndarray, top_n: int
+        self, questions: list[str], all_dists: np.ndarray, labels: np.ndarray,
+        top_n: int
     ) -> list[dict]:
         """Build cluster summaries with representatives."""
-        n = len(records)
-
-        # Group by cluster
-        clusters: dict[int, list[int]] = {}
-        for idx, label in enumerate(labels):
-            if label not in clusters:
-                clusters[label] = []
-            clusters[label].append(idx)
+        n = len(questions)
+
+        # Group by cluster: one stable argsort yields contiguous member
+        # slices per cluster instead of a Python append loop over N rows
+        order = np.argsort(labels, kind="stable")
+        cluster_ids, first = np.unique(labels[order], return_index=True)
+        boundaries = np.append(first, len(labels))
+        clusters = {
+            int(cluster_ids[c]): order[boundaries[c]:boundaries[c + 1]]
+            for c in range(cluster_ids.size)
+        }
 
         # Sort by size
         clusters_sorted = sorted(clusters.items(), key=lambda kv: len(kv[1]), reverse=True)
@@ -206,22 +264,28 @@ class TopicsStrategy(Strategy):
             size = len(idxs)
             pct = size / n * 100
 
-            # Sample representatives (near center, middle, far)
-            members = np.array(idxs)
-            dists = np.linalg.norm(X[members] - centers[label], axis=1)
-            sorted_by_dist = members[np.argsort(dists)]
+            # Sample representatives (near center, middle, far) using the
+            # precomputed own-center distances
+            members = idxs
+            dists = all_dists[members]
 
-            sample_indices = []
-            n_members = len(sorted_by_dist)
+            # Only the 4 nearest, 4 middle and 4 farthest members are needed,
+            # so partition around those ranks instead of fully sorting
+            n_members = members.size
             if n_members >= 12:
-                sample_indices.extend(sorted_by_dist[:4])
                 mid_start = n_members // 3
-                sample_indices.extend(sorted_by_dist[mid_start:mid_start + 4])
-                sample_indices.extend(sorted_by_dist[-4:])
+                part = np.argpartition(
+                    dists, [3, mid_start, mid_start + 3, n_members - 4]
+                )
+                sample_indices = members[
+                    np.concatenate(
+                        [part[:4], part[mid_start:mid_start + 4], part[-4:]]
+                    )
+                ]
             else:
-                sample_indices = sorted_by_dist[:min(12, n_members)]
+                sample_indices = members[np.argsort(dists)]
 
-            reps = [self._summarize_question(records[i]["question"]) for i in sample_indices]
+            reps = [self._summarize_question(questions[i]) for i in sample_indices]
 
             summaries.append({
                 "rank": rank,
@@ -237,6 +301,43 @@ class TopicsStrategy(Strategy):
         compact = " ".join(q.split())
         return compact if len(compact) <= limit else compact[:limit - 1] + "…"
 
+    def _cached_chat(
+        self, client: OpenAI, model: str, messages: list[dict], max_tokens: int
+    ) -> str:
+        """Chat completion with an on-disk cache keyed by model + prompt.
+
+        Labels and summaries are deterministic enough functions of their
+        prompts that re-runs with unchanged clusters can skip the API call.
+        """
+        key = hashlib.sha256(
+            (model + "\x00" + json.dumps(messages, sort_keys=True)).encode()
+        ).hexdigest()
+
+        self.output_dir.mkdir(exist_ok=True)
+        con = sqlite3.connect(self.output_dir / "llm_cache.sqlite")
+        try:
+            con.execute(
+                "CREATE TABLE IF NOT EXISTS completions (key TEXT PRIMARY KEY, text TEXT)"
+            )
+            row = con.execute(
+                "SELECT text FROM completions WHERE key = ?", (key,)
+            ).fetchone()
+            if row is not None:
+                return row[0]
+
+            resp = client.chat.completions.create(
+                model=model, max_tokens=max_tokens, messages=messages
+            )
+            text = resp.choices[0].message.content.strip()
+            con.execute(
+                "INSERT OR REPLACE INTO completions (key, text) VALUES (?, ?)",
+                (key, text),
+            )
+            con.commit()
+        finally:
+            con.close()
+        return text
+
     def _generate_cluster_labels(self, client: OpenAI, summaries: list[dict]) -> dict[int, str]:
         """Generate labels for topic clusters."""
         descriptions = []
@@ -247,7 +348,8 @@ class TopicsStrategy(Strategy):
         prompt = "\n".join(descriptions)
 
         try:
-            resp = client.chat.completions.create(
+            content = self._cached_chat(
+                client,
                 model="gpt-4o-mini",
                 max_tokens=500,
                 messages=[
@@ -264,7 +366,7 @@ IMPORTANT: Plain text only. No markdown, no asterisks, no quotes, no formatting.
                 ],
             )
             labels = {}
-            for line in resp.choices[0].message.content.strip().split("\n"):
+            for line in content.split("\n"):
                 if ":" in line:
                     parts = line.split(":", 1)
                     try:
@@ -288,7 +390,8 @@ IMPORTANT: Plain text only. No markdown, no asterisks, no quotes, no formatting.
     def _generate_witty_summary(self, client: OpenAI, cluster_list: str) -> str:
         """Generate tarot card reading summary."""
         try:
-            resp = client.chat.completions.create(
+            return self._cached_chat(
+                client,
                 model="gpt-4o-mini",
                 max_tokens=250,
                 messages=[
@@ -313,31 +416,27 @@ RULES:
                     },
                 ],
             )
-            return resp.choices[0].message.content.strip()
         except Exception as e:
             return f"(Could not generate summary: {e})"
 
     def _parse_tarot_info(self, summary: str) -> dict:
         """Parse tarot card name and persona from summary."""
-        import re
-
-        card_match = re.search(r"\*\*([^*]+)\*\*", summary)
+        card_match = _CARD_RE.search(summary)
         card = card_match.group(1) if card_match else "The Magician"
 
-        persona_match = re.search(r"—\s*\*([^*]+)\*", summary)
+        persona_match = _PERSONA_RE.search(summary)
         persona = persona_match.group(1) if persona_match else "Code Alchemist"
 
         return {"card": card.strip(), "persona": persona.strip()}
 
     def _generate_tarot_image(self, tarot_description: str):
         """Generate tarot card image using Gemini."""
-        api_key = os.environ.get("GOOGLE_API_KEY") or os.environ.get("GEMINI_API_KEY")
-        if not api_key:
+        client = self._genai_client
+        if client is None:
             return None
 
         try:
             full_prompt = TAROT_IMAGE_STYLE + tarot_description
-            client = genai.Client(api_key=api_key)
 
             config = genai_types.GenerateContentConfig(
                 response_modalities=["IMAGE"],
@@ -365,28 +464,35 @@ RULES:
             return None
 
     def _gather_cluster_examples(
-        self, records: list[dict], X: np.ndarray, centers: np.ndarray, cluster_key: str
+        self, questions: list[str], dists: np.ndarray, labels: np.ndarray
     ) -> dict[int, list[str]]:
         """Gather example questions for each cluster."""
-        cluster_items: dict[int, list[tuple[float, str]]] = defaultdict(list)
-        for i, rec in enumerate(records):
-            cluster_id = rec[cluster_key]
-            dist = np.linalg.norm(X[i] - centers[cluster_id])
-            cluster_items[cluster_id].append((dist, rec["question"]))
-
-        examples = {}
-        for cluster_id, items in cluster_items.items():
-            items.sort(key=lambda x: x[0])
-            n_items = len(items)
-            sampled = []
+        # Group members per cluster with one stable argsort, then partition
+        # each cluster's distances around the 5 near / 5 mid / 5 far ranks
+        # rather than sorting tuple lists; only the chosen questions are
+        # ever sliced
+        order = np.argsort(labels, kind="stable")
+        cluster_ids, first = np.unique(labels[order], return_index=True)
+        boundaries = np.append(first, len(labels))
+
+        examples: dict[int, list[str]] = {}
+        for c in range(cluster_ids.size):
+            members = order[boundaries[c]:boundaries[c + 1]]
+            d = dists[members]
+            n_items = members.size
             if n_items >= 15:
-                sampled.extend(items[:5])
                 mid_start = n_items // 3
-                sampled.extend(items[mid_start:mid_start + 5])
-                sampled.extend(items[-5:])
+                part = np.argpartition(
+                    d, [4, mid_start, mid_start + 4, n_items - 5]
+                )
+                chosen = members[
+                    np.concatenate(
+                        [part[:5], part[mid_start:mid_start + 5], part[-5:]]
+                    )
+                ]
             else:
-                sampled = items
-            examples[cluster_id] = [q[:80] for _, q in sampled]
+                chosen = members[np.argsort(d)]
+            examples[int(cluster_ids[c])] = [questions[i][:80] for i in chosen]
 
         return examples
 
@@ -400,7 +506,8 @@ RULES:
         prompt = "\n".join(lines)
 
         try:
-            resp = client.chat.completions.create(
+            content = self._cached_chat(
+                client,
                 model="gpt-4o-mini",
                 max_tokens=600,
                 messages=[
@@ -425,7 +532,7 @@ IMPORTANT: Plain text only. No markdown, no asterisks, no quotes, no formatting.
             )
 
             labels = {}
-            for line in resp.choices[0].message.content.strip().split("\n"):
+            for line in content.split("\n"):
                 if ":" in line:
                     parts = line.split(":", 1)
                     try:
@@ -443,42 +550,49 @@ IMPORTANT: Plain text only. No markdown, no asterisks, no quotes, no formatting.
         except Exception:
             return {cid: "Diverse Queries" for cid in examples.keys()}
 
-    def _build_streamgraph(self, records: list[dict], labels: dict[int, str]) -> dict[str, Any]:
+    def _build_streamgraph(
+        self, periods: list[str], stream_labels: np.ndarray, labels: dict[int, str]
+    ) -> dict[str, Any]:
         """Build streamgraph data structure."""
         # Get periods, excluding current incomplete one
-        periods = sorted(set(r["period"] for r in records))
-
         now = datetime.now()
         iso_year, iso_week, _ = now.isocalendar()
         current_period_num = (iso_week - 1) // self.PERIOD_WEEKS
         current_period = f"{iso_year}-P{current_period_num:02d}"
-        periods = [p for p in periods if p < current_period]
+        kept_periods = sorted(p for p in set(periods) if p < current_period)
+
+        # Period x topic counts as one scatter-add into an int matrix
+        # instead of nested defaultdict increments per record
+        period_to_idx = {p: i for i, p in enumerate(kept_periods)}
+        labels_arr = np.asarray(stream_labels, dtype=np.int64)
+        topic_totals = np.bincount(labels_arr)
 
-        # Count per period per topic
-        period_topic_counts = defaultdict(lambda: defaultdict(int))
-        for rec in records:
-            if rec["period"] in periods:
-                period_topic_counts[rec["period"]][rec["stream_cluster"]] += 1
+        pi = np.fromiter(
+            (period_to_idx.get(p, -1) for p in periods),
+            dtype=np.int64, count=len(periods),
+        )
+        in_kept = pi >= 0
+        counts = np.zeros((len(kept_periods), topic_totals.size), dtype=np.int64)
+        np.add.at(counts, (pi[in_kept], labels_arr[in_kept]), 1)
 
-        # Sort topics by total count
-        topic_totals = defaultdict(int)
-        for rec in records:
-            topic_totals[rec["stream_cluster"]] += 1
-        sorted_topics = sorted(topic_totals.keys(), key=lambda t: -topic_totals[t])
+        sorted_topics = [
+            int(t) for t in np.argsort(-topic_totals, kind="stable")
+            if topic_totals[t] > 0
+        ]
 
         # Build output
         keys = [labels.get(t, "Diverse Queries") for t in sorted_topics]
 
         values = []
-        for period in periods:
+        for pidx, period in enumerate(kept_periods):
             row = {"period": period}
             for t in sorted_topics:
                 label = labels.get(t, "Diverse Queries")
-                row[label] = period_topic_counts[period][t]
+                row[label] = int(counts[pidx, t])
             values.append(row)
 
         return {
-            "periods": periods,
+            "periods": kept_periods,
             "keys": keys,
             "values": values,
         }